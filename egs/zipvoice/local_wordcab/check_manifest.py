@@ -1,29 +1,29 @@
 #!/usr/bin/env python3
 import argparse
-import gzip
 import json
 import shutil
 import time
-from collections import Counter
-from typing import Iterable, TextIO
 
-def open_reader(path: str, gz: bool) -> Iterable[str]:
-    """Yield lines from a text file, gzipped if gz=True."""
-    if gz:
-        fh = gzip.open(path, "rt", encoding="utf-8")
-    else:
-        fh = open(path, "r", encoding="utf-8")
+from manifest_io import json_line_dumper, json_loads, open_lines, open_writer
+
+json_dumps_line = json_line_dumper(ensure_ascii=True)
+
+def report_invalid_line(raw_line: bytes) -> None:
+    """
+    Print why a line failed to parse. Whitespace-only lines are skipped
+    silently; the line is re-parsed stripped (error path only), so the
+    reported position doesn't depend on the trailing newline.
+    """
+    line = raw_line.strip()
+    if not line:
+        return
     try:
-        for line in fh:
-            yield line
-    finally:
-        fh.close()
+        json_loads(line)
+    except ValueError as e:
+        print(f"Skipping invalid JSON line: {e}")
 
-def open_writer(path: str, gz: bool) -> TextIO:
-    """Open a text writer, gzipped if gz=True."""
-    if gz:
-        return gzip.open(path, "wt", encoding="utf-8")
-    return open(path, "w", encoding="utf-8")
+# Size at which the accumulated output is handed to the writer.
+OUT_FLUSH_SIZE = 1 << 20
 
 def main():
     parser = argparse.ArgumentParser(
@@ -52,12 +52,21 @@ def main():
             raise ValueError
     except Exception:
         parser.error('--target-channel must be a JSON list, e.g. "[0]" or "[0,1]".')
+    # compared against the normalized ch_key; only list channels can match
+    # (as before, a scalar "channel": 0 does not match [0])
+    target_ch_key = tuple(target_channel)
 
-    sampling_rates = Counter()
-    channels = Counter()
+    sampling_rates = {}
+    channels = {}
     total = 0
     kept = 0
 
+    _loads = json_loads
+    _isinstance = isinstance
+    sr_get = sampling_rates.get
+    ch_get = channels.get
+    target_sr = args.target_sampling_rate
+
     if args.fix:
         # Move original to backup (preserves compressed bytes if gz)
         backup_path = f"{args.manifest}.{int(time.time())}.bak"
@@ -65,79 +74,86 @@ def main():
 
         # Read from backup, write filtered to original filename
         out_fh = open_writer(args.manifest, gz=input_is_gz)
+        _dumps = json_dumps_line
+        # kept cuts are serialized into one buffer, written out in ~1 MiB blocks
+        out_buf = bytearray()
         try:
-            for raw_line in open_reader(backup_path, gz=input_is_gz):
-                line = raw_line.strip()
-                if not line:
-                    continue
+            with open_lines(backup_path, gz=input_is_gz) as in_fh:
+                for raw_line in in_fh:
+                    try:
+                        # the parser skips surrounding whitespace itself; no strip() copy
+                        obj = _loads(raw_line)
+                    except ValueError:
+                        report_invalid_line(raw_line)
+                        continue
+
+                    rec = obj.get("recording")
+                    sr = rec.get("sampling_rate") if rec else None
+                    ch = obj.get("channel")
+
+                    # normalize channel for counting
+                    if _isinstance(ch, list):
+                        ch_key = tuple(ch)
+                    elif ch is None:
+                        ch_key = None
+                    else:
+                        # if it's a single int, normalize to list form for comparison
+                        ch_key = (ch,)
+
+                    if sr is not None:
+                        sampling_rates[sr] = sr_get(sr, 0) + 1
+                    if ch_key is not None:
+                        channels[ch_key] = ch_get(ch_key, 0) + 1
+
+                    total += 1
+
+                    # Keep only matching entries
+                    if sr == target_sr and ch_key == target_ch_key and _isinstance(ch, list):
+                        kept += 1
+                        out_buf += _dumps(obj)
+                        if len(out_buf) >= OUT_FLUSH_SIZE:
+                            out_fh.write(out_buf)
+                            out_buf.clear()
+            out_fh.write(out_buf)
+        finally:
+            out_fh.close()
+    else:
+        # Just count, no modification
+        with open_lines(args.manifest, gz=input_is_gz) as in_fh:
+            for raw_line in in_fh:
                 try:
-                    obj = json.loads(line)
-                except json.JSONDecodeError as e:
-                    print(f"Skipping invalid JSON line: {e}")
+                    # the parser skips surrounding whitespace itself; no strip() copy
+                    obj = _loads(raw_line)
+                except ValueError:
+                    report_invalid_line(raw_line)
                     continue
 
-                sr = obj.get("recording", {}).get("sampling_rate")
+                rec = obj.get("recording")
+                sr = rec.get("sampling_rate") if rec else None
                 ch = obj.get("channel")
 
-                # normalize channel for counting
-                if isinstance(ch, list):
+                if _isinstance(ch, list):
                     ch_key = tuple(ch)
                 elif ch is None:
                     ch_key = None
                 else:
-                    # if it's a single int, normalize to list form for comparison
                     ch_key = (ch,)
 
                 if sr is not None:
-                    sampling_rates[sr] += 1
+                    sampling_rates[sr] = sr_get(sr, 0) + 1
                 if ch_key is not None:
-                    channels[ch_key] += 1
+                    channels[ch_key] = ch_get(ch_key, 0) + 1
 
                 total += 1
 
-                # Keep only matching entries
-                if sr == args.target_sampling_rate and ch == target_channel:
-                    kept += 1
-                    out_fh.write(json.dumps(obj) + "\n")
-        finally:
-            out_fh.close()
-    else:
-        # Just count, no modification
-        for raw_line in open_reader(args.manifest, gz=input_is_gz):
-            line = raw_line.strip()
-            if not line:
-                continue
-            try:
-                obj = json.loads(line)
-            except json.JSONDecodeError as e:
-                print(f"Skipping invalid JSON line: {e}")
-                continue
-
-            sr = obj.get("recording", {}).get("sampling_rate")
-            ch = obj.get("channel")
-
-            if isinstance(ch, list):
-                ch_key = tuple(ch)
-            elif ch is None:
-                ch_key = None
-            else:
-                ch_key = (ch,)
-
-            if sr is not None:
-                sampling_rates[sr] += 1
-            if ch_key is not None:
-                channels[ch_key] += 1
-
-            total += 1
-
     # Output stats
     print("=== Sampling Rates ===")
-    for k in sorted(sampling_rates):
-        print(f"{k}\t{sampling_rates[k]}")
+    for k, n in sorted(sampling_rates.items()):
+        print(f"{k}\t{n}")
 
     print("\n=== Channels ===")
-    for k in sorted(channels):
-        print(f"{list(k)}\t{channels[k]}")
+    for k, n in sorted(channels.items()):
+        print(f"{list(k)}\t{n}")
 
     if args.fix:
         print(f"\nOriginal manifest moved to: {backup_path}")
@@ -1,29 +1,27 @@
 #!/usr/bin/env python3
 import argparse
-import gzip
 import json
+import multiprocessing
 import os
 import re
 import shutil
+import threading
 import time
 import unicodedata
 from collections import Counter, defaultdict
-from typing import Dict, Iterable, Iterator, Optional, Tuple
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from manifest_io import json_line_dumper, json_loads, open_lines, open_writer
+
+json_dumps_line = json_line_dumper(ensure_ascii=False)
 
 # ---------- IO helpers (strict UTF-8 with decode-error detection) ----------
 
 def open_reader_bytes(path: str, gz: bool) -> Iterator[bytes]:
     """Yield raw lines (bytes) from file, supporting gzip."""
-    fh = gzip.open(path, "rb") if gz else open(path, "rb")
-    try:
-        for line in fh:
-            yield line
-    finally:
-        fh.close()
-
-def open_writer(path: str, gz: bool):
-    """Open a text writer, gzipped if gz=True."""
-    return gzip.open(path, "wt", encoding="utf-8", newline="\n") if gz else open(path, "w", encoding="utf-8", newline="\n")
+    with open_lines(path, gz) as fh:
+        yield from fh
 
 # ---------- Unicode normalization utilities ----------
 
@@ -65,73 +63,76 @@ _PUNCT_MAP = {
     "\u3000": " ",  # IDEOGRAPHIC SPACE
 }
 
-_PUNCT_TRANS = str.maketrans(_PUNCT_MAP)
+# Control characters (Cc) to drop, keeping \t, \n and \r.
+_CTRL_CHARS = "".join(chr(c) for c in (*range(0x00, 0x09), 0x0B, 0x0C, *range(0x0E, 0x20), 0x7F))
+# Zero-width characters to drop; U+180E is in _PUNCT_MAP and becomes a space.
+_ZW_DROP = "".join(ch for ch in _ZW_CHARS if ch not in _PUNCT_MAP)
 
-_CTRL_REGEX = re.compile(
-    # All Cc (control) or Cf (format) except allowed whitespace
-    r"[\u0000-\u0008\u000B\u000C\u000E-\u001F\u007F"
-    r"\u200B-\u200D\u2060\uFEFF]"
-)
+# Single translate() table: punctuation/space mapping plus deletions, so the
+# whole cleanup is one C-level pass over the string.
+_FULL_TABLE = {ord(k): v for k, v in _PUNCT_MAP.items()}
+_FULL_TABLE.update(dict.fromkeys(map(ord, _CTRL_CHARS + _ZW_DROP)))
 
-def _drop_controls(s: str) -> Tuple[str, int, int]:
-    """Remove control chars; count (controls_removed, zw_removed)."""
-    controls_removed = 0
-    zw_removed = 0
-    def repl(m):
-        nonlocal controls_removed, zw_removed
-        chs = m.group(0)
-        for ch in chs:
-            if ch in _ZW_CHARS:
-                zw_removed += 1
-            else:
-                controls_removed += 1
-        return ""
-    return _CTRL_REGEX.sub(repl, s), controls_removed, zw_removed
+# char -> stats key, used to attribute what the translate() pass changed
+_CHAR_STAT = dict.fromkeys(_PUNCT_MAP, "replaced_punct")
+_CHAR_STAT.update(dict.fromkeys(_CTRL_CHARS, "controls_removed"))
+_CHAR_STAT.update(dict.fromkeys(_ZW_DROP, "zero_width_removed"))
 
 _WS_MULTI = re.compile(r"[ \t\f\v]+")
-_WS_LINES = re.compile(r"[ \t\f\v]*\n[ \t\f\v]*")  # trim spaces around newlines
+# A run of newlines (after _WS_MULTI, with at most single spaces around them):
+# trimmed of the spaces and collapsed to "\n", or "\n\n" when it holds 2+
+# newlines (group 1 captures the second one), in one pass.
+_WS_NEWLINES = re.compile(r" ?\n(?: ?(\n))?(?: ?\n)* ?")
 
-def normalize_text(s: str) -> Tuple[str, Dict[str, int]]:
+# Texts that took the ASCII fast path in normalize_text() (in this process).
+ascii_fastpath_hits = 0
+
+def normalize_text(s: str, detailed_stats: bool = False) -> Tuple[str, Dict[str, int]]:
     """
     Normalize Unicode issues in free text.
     Returns (normalized_text, stats_dict)
-    stats keys: replaced_punct, controls_removed, zero_width_removed, nbspace_to_space, whitespace_collapsed, nkfc_changes
+    stats keys: nkfc_changes (texts changed by NFKC), whitespace_collapsed, and either
+    translate_len_delta (chars removed minus chars added by the mapping), or with
+    detailed_stats=True: replaced_punct, controls_removed, zero_width_removed, nbspace_to_space
     """
+    global ascii_fastpath_hits
     stats = defaultdict(int)
 
-    # 1) NFKC normalize
-    before = s
-    s = unicodedata.normalize("NFKC", s)
-    if s != before:
-        stats["nkfc_changes"] += sum(1 for a, b in zip(before, s) if a != b) + abs(len(before) - len(s))
-
-    # 2) Replace fancy punctuation & odd spaces via mapping
-    before = s
-    s = s.translate(_PUNCT_TRANS)
-    if s != before:
-        # count approx how many mapped chars (difference by per-char membership)
-        stats["replaced_punct"] += sum(1 for ch in before if ch in _PUNCT_MAP)
-
-    # Count NBSP specifically (already translated above)
-    stats["nbspace_to_space"] += before.count("\u00A0")
-
-    # 3) Drop control and zero-width characters
-    s, controls_removed, zw_removed = _drop_controls(s)
-    stats["controls_removed"] += controls_removed
-    stats["zero_width_removed"] += zw_removed
-
-    # 4) Normalize whitespace
+    if s.isascii() and s.isprintable():
+        # Printable ASCII (no controls, tabs or newlines) is left unchanged by
+        # NFKC and the translate table; only the whitespace steps can apply.
+        ascii_fastpath_hits += 1
+    else:
+        # 1) NFKC normalize
+        before = s
+        s = unicodedata.normalize("NFKC", s)
+        stats["nkfc_changes"] += int(s != before)
+
+        # 2) Replace fancy punctuation & odd spaces, drop control and zero-width
+        #    characters (one translate() pass)
+        before = s
+        s = s.translate(_FULL_TABLE)
+        if not detailed_stats:
+            stats["translate_len_delta"] += len(before) - len(s)
+        elif s != before:
+            # one scan of the input, then only the distinct chars are classified
+            counts = Counter(before)
+            for ch, n in counts.items():
+                key = _CHAR_STAT.get(ch)
+                if key is not None:
+                    stats[key] += n
+            stats["nbspace_to_space"] += counts["\u00A0"]
+
+    # 3) Normalize whitespace
     before = s
     # collapse spaces/tabs/etc (not newlines)
     s = _WS_MULTI.sub(" ", s)
-    # trim space around newlines
-    s = _WS_LINES.sub("\n", s)
-    # collapse multiple newlines to max 2
-    s = re.sub(r"\n{3,}", "\n\n", s)
+    # trim space around newlines and collapse multiple newlines to max 2
+    s = _WS_NEWLINES.sub("\n\\1", s)
     if s != before:
         stats["whitespace_collapsed"] += 1
 
-    # 5) Strip leading/trailing whitespace
+    # 4) Strip leading/trailing whitespace
     s_stripped = s.strip()
     if s_stripped != s:
         stats["whitespace_collapsed"] += 1
@@ -139,15 +140,141 @@ def normalize_text(s: str) -> Tuple[str, Dict[str, int]]:
 
     return s, stats
 
-def _iter_lines_utf8(path: str, gz: bool) -> Iterator[Tuple[Optional[str], Optional[Exception]]]:
+def iter_batches(items: Iterable, size: int) -> Iterator[list]:
+    """Group an iterable into lists of at most `size` items."""
+    it = iter(items)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+# ---------- Per-batch worker ----------
+
+# Number of manifest lines a worker processes per task.
+BATCH_LINES = 10_000
+
+# Filtering options for process_batch(); set by _init_worker() in each process.
+_opts: dict = {}
+
+def _init_worker(opts: dict):
+    global _opts
+    _opts = opts
+
+def process_batch(lines: List[bytes]) -> Tuple[bytearray, Counter, Dict, Dict, Counter]:
     """
-    Yield (line, error). If the raw line fails to decode as UTF-8, returns (None, UnicodeDecodeError).
+    Parse, count, normalize and filter one batch of raw manifest lines.
+    Returns (output, tallies, sampling_rates, channels, norm_stats); output holds
+    the serialized kept cuts, one per line (only filled when _opts["write"] is set).
     """
-    for raw in open_reader_bytes(path, gz=gz):
+    min_duration = _opts["min_duration"]
+    target_sampling_rate = _opts["target_sampling_rate"]
+    target_ch_key = _opts["target_ch_key"]
+    keep_empty_text = _opts["keep_empty_text"]
+    detailed_stats = _opts["stats"]
+    write = _opts["write"]
+
+    # kept cuts are serialized back to back into one buffer per batch
+    out_buf = bytearray()
+    tallies = Counter()
+    sampling_rates = {}
+    channels = {}
+    agg_norm_stats = Counter()
+    fastpath_hits_before = ascii_fastpath_hits
+
+    _loads = json_loads
+    _dumps = json_dumps_line
+    _norm = normalize_text
+    _isinstance = isinstance
+    sr_get = sampling_rates.get
+    ch_get = channels.get
+
+    for raw in lines:
+        # Parse the raw bytes directly: the parser skips surrounding whitespace
+        # and rejects invalid UTF-8, so no per-line strip()/decode() is needed.
         try:
-            yield raw.decode("utf-8"), None
-        except UnicodeDecodeError as e:
-            yield None, e
+            obj = _loads(raw)
+        except ValueError:  # JSONDecodeError, or UnicodeDecodeError from stdlib json
+            if not raw.strip():
+                continue  # whitespace-only line
+            try:
+                raw.decode("utf-8")
+            except UnicodeDecodeError:
+                # skip undecodable line entirely
+                tallies["decode_errors"] += 1
+            else:
+                tallies["invalid_json"] += 1
+            continue
+
+        # Gather base stats
+        rec = obj.get("recording")
+        sr = rec.get("sampling_rate") if rec else None
+        dur = obj.get("duration")  # top-level duration of the cut
+        ch = obj.get("channel")
+        if _isinstance(ch, list):
+            ch_key = tuple(ch)
+        elif ch is None:
+            ch_key = None
+        else:
+            ch_key = (ch,)
+
+        if sr is not None:
+            sampling_rates[sr] = sr_get(sr, 0) + 1
+        if ch_key is not None:
+            channels[ch_key] = ch_get(ch_key, 0) + 1
+
+        tallies["total"] += 1
+
+        # Cheap scalar filters first, so rejected cuts never pay for the
+        # text normalization below.
+        # Filter by min duration (must be present and >= min-duration)
+        meets_duration = (_isinstance(dur, (int, float)) and dur >= min_duration)
+        if not meets_duration:
+            if _isinstance(dur, (int, float)) and dur < min_duration:
+                tallies["too_short_duration"] += 1
+            # If duration is missing or too short, skip
+            continue
+
+        # Filter by target sampling_rate and channel
+        if not (sr == target_sampling_rate and ch_key == target_ch_key and _isinstance(ch, list)):
+            tallies["format_mismatch"] += 1
+            continue
+
+        # Clean unicode in all supervision texts
+        sups = obj.get("supervisions") or []
+        any_change = False
+        entry_norm_stats = Counter()
+
+        for sup in sups:
+            txt = sup.get("text")
+            if _isinstance(txt, str):
+                new_txt, st = _norm(txt, detailed_stats=detailed_stats)
+                if new_txt != txt:
+                    any_change = True
+                entry_norm_stats.update(st)
+                sup["text"] = new_txt
+
+        if any_change:
+            tallies["normalized_entries"] += 1
+            agg_norm_stats.update(entry_norm_stats)
+
+        # Optionally drop if ALL supervision texts are empty after normalization
+        if sups:
+            if all((not _isinstance(s.get("text"), str)) or (s.get("text").strip() == "") for s in sups):
+                tallies["empty_text_after_norm"] += 1
+                # Usually it's safer to keep the cut but you might want to drop it.
+                # We'll keep by default unless user passes a flag. (Default behavior: keep.)
+                if not keep_empty_text:
+                    # if we are not keeping empty text, treat as not matching (skip write), but still counted above
+                    continue
+
+        tallies["kept"] += 1
+        if write:
+            # write cleaned version
+            out_buf += _dumps(obj)
+
+    tallies["ascii_fastpath_hits"] += ascii_fastpath_hits - fastpath_hits_before
+    return out_buf, tallies, sampling_rates, channels, agg_norm_stats
 
 # ---------- Main program ----------
 
@@ -170,6 +297,12 @@ def main():
                              "Enable this to keep them anyway (useful if model can handle empty text).")
     parser.add_argument("--min-duration", type=float, default=3.0,
                         help="Minimum cut duration (in seconds) to keep (default: 3.0)")
+    parser.add_argument("--stats", action="store_true",
+                        help="Report exact per-category character counts for the text cleanup "
+                             "(slower; by default only the net length change is reported).")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="Number of worker processes for parsing/normalization "
+                             "(default: number of CPUs; 1 disables multiprocessing).")
     args = parser.parse_args()
 
     input_is_gz = args.manifest.endswith(".gz")
@@ -181,19 +314,16 @@ def main():
             raise ValueError
     except Exception:
         parser.error('--target-channel must be a JSON list, e.g. "[0]" or "[0,1]".')
+    # compared against the normalized ch_key; only list channels can match
+    # (as before, a scalar "channel": 0 does not match [0])
+    target_ch_key = tuple(target_channel)
 
     # Counters
     sampling_rates = Counter()
     channels = Counter()
-    total = 0
-    kept = 0
-
-    # Unicode statistics
-    decode_errors = 0
-    invalid_json = 0
-    normalized_entries = 0
-    empty_text_after_norm = 0
-    too_short_duration = 0  # new: count entries rejected by min-duration
+    # total, kept, decode_errors, invalid_json, normalized_entries,
+    # empty_text_after_norm, too_short_duration, format_mismatch, ascii_fastpath_hits
+    tallies = Counter()
 
     # Aggregated char-level stats
     agg_norm_stats = Counter()
@@ -208,118 +338,95 @@ def main():
         in_path = args.manifest
         out_fh = None
 
-    try:
-        for line_str, err in _iter_lines_utf8(in_path, gz=input_is_gz):
-            if err is not None:
-                decode_errors += 1
-                # skip undecodable line entirely
-                continue
-
-            line = line_str.strip()
-            if not line:
-                continue
+    opts = {
+        "min_duration": args.min_duration,
+        "target_sampling_rate": args.target_sampling_rate,
+        "target_ch_key": target_ch_key,
+        "keep_empty_text": args.keep_empty_text,
+        "stats": args.stats,
+        "write": out_fh is not None,
+    }
+    batches = iter_batches(open_reader_bytes(in_path, gz=input_is_gz), BATCH_LINES)
+
+    pool = None
+    if args.jobs > 1:
+        pool = multiprocessing.Pool(args.jobs, initializer=_init_worker, initargs=(opts,))
+        # Pool.imap() reads its input eagerly; cap the batches in flight so
+        # a multi-GB manifest is not pulled into memory ahead of the workers.
+        in_flight = threading.BoundedSemaphore(2 * args.jobs)
+
+        def throttled(it):
+            for batch in it:
+                in_flight.acquire()
+                yield batch
+
+        results = pool.imap(process_batch, throttled(batches), chunksize=1)
+    else:
+        _init_worker(opts)
+        results = map(process_batch, batches)
 
-            try:
-                obj = json.loads(line)
-            except json.JSONDecodeError:
-                invalid_json += 1
-                continue
-
-            # Gather base stats
-            sr = obj.get("recording", {}).get("sampling_rate")
-            dur = obj.get("duration")  # top-level duration of the cut
-            ch = obj.get("channel")
-            if isinstance(ch, list):
-                ch_key = tuple(ch)
-            elif ch is None:
-                ch_key = None
-            else:
-                ch_key = (ch,)
-
-            if sr is not None:
-                sampling_rates[sr] += 1
-            if ch_key is not None:
-                channels[ch_key] += 1
-
-            total += 1
-
-            # Clean unicode in all supervision texts
-            sups = obj.get("supervisions") or []
-            any_change = False
-            entry_norm_stats = Counter()
-
-            for sup in sups:
-                txt = sup.get("text")
-                if isinstance(txt, str):
-                    new_txt, st = normalize_text(txt)
-                    if new_txt != txt:
-                        any_change = True
-                    entry_norm_stats.update(st)
-                    sup["text"] = new_txt
-
-            if any_change:
-                normalized_entries += 1
-                agg_norm_stats.update(entry_norm_stats)
-
-            # Optionally drop if ALL supervision texts are empty after normalization
-            if sups:
-                if all((not isinstance(s.get("text"), str)) or (s.get("text").strip() == "") for s in sups):
-                    empty_text_after_norm += 1
-                    # Usually it's safer to keep the cut but you might want to drop it.
-                    # We'll keep by default unless user passes a flag. (Default behavior: keep.)
-                    if not args.keep_empty_text:
-                        # if we are not keeping empty text, treat as not matching (skip write), but still counted above
-                        continue
-
-            # Filter by min duration first (must be present and >= min-duration)
-            meets_duration = (isinstance(dur, (int, float)) and dur >= args.min_duration)
-            if not meets_duration:
-                if isinstance(dur, (int, float)) and dur < args.min_duration:
-                    too_short_duration += 1
-                # If duration is missing or too short, skip
-                continue
-
-            # Filter by target sampling_rate and channel (same logic as before)
-            if sr == args.target_sampling_rate and ch == target_channel:
-                kept += 1
-                if out_fh is not None:
-                    # write cleaned version
-                    out_fh.write(json.dumps(obj, ensure_ascii=False) + "\n")
-            else:
-                # not kept — do nothing
-                pass
+    try:
+        # imap() yields in input order, so the output keeps the manifest order
+        for out_buf, batch_tallies, batch_srs, batch_chs, batch_norm in results:
+            if pool is not None:
+                in_flight.release()
+            if out_fh is not None:
+                out_fh.write(out_buf)
+            # update() (not +=) so negative deltas such as translate_len_delta survive
+            tallies.update(batch_tallies)
+            sampling_rates.update(batch_srs)
+            channels.update(batch_chs)
+            agg_norm_stats.update(batch_norm)
     finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
         if out_fh is not None:
             out_fh.close()
 
+    total = tallies["total"]
+    kept = tallies["kept"]
+    decode_errors = tallies["decode_errors"]
+    invalid_json = tallies["invalid_json"]
+    normalized_entries = tallies["normalized_entries"]
+    empty_text_after_norm = tallies["empty_text_after_norm"]
+    too_short_duration = tallies["too_short_duration"]
+    format_mismatch = tallies["format_mismatch"]
+
     # ---------- Summary ----------
     print("=== Sampling Rates ===")
-    for k in sorted(sampling_rates):
-        print(f"{k}\t{sampling_rates[k]}")
+    for k, n in sorted(sampling_rates.items()):
+        print(f"{k}\t{n}")
 
     print("\n=== Channels ===")
-    for k in sorted(channels):
-        print(f"{list(k)}\t{channels[k]}")
+    for k, n in sorted(channels.items()):
+        print(f"{list(k)}\t{n}")
 
     print("\n=== Unicode / Text Cleanup Summary ===")
+    print("(text stats cover only cuts passing the duration/sampling_rate/channel filters)")
     print(f"Lines with UTF-8 decode errors (skipped): {decode_errors}")
     print(f"Lines with invalid JSON (skipped):        {invalid_json}")
     print(f"Entries with normalized text:             {normalized_entries}")
+    print(f"Texts on the ASCII fast path:             {tallies['ascii_fastpath_hits']}")
 
     # Detail the normalization tallies
     if agg_norm_stats:
         def get(k): return agg_norm_stats.get(k, 0)
         print("  Character-level changes:")
         print(f"    nkfc_changes:         {get('nkfc_changes')}")
-        print(f"    replaced_punct:       {get('replaced_punct')}")
-        print(f"    nbspace_to_space:     {get('nbspace_to_space')}")
-        print(f"    zero_width_removed:   {get('zero_width_removed')}")
-        print(f"    controls_removed:     {get('controls_removed')}")
+        if args.stats:
+            print(f"    replaced_punct:       {get('replaced_punct')}")
+            print(f"    nbspace_to_space:     {get('nbspace_to_space')}")
+            print(f"    zero_width_removed:   {get('zero_width_removed')}")
+            print(f"    controls_removed:     {get('controls_removed')}")
+        else:
+            print(f"    translate_len_delta:  {get('translate_len_delta')}")
         print(f"    whitespace_norm_ops:  {get('whitespace_collapsed')}")
 
     print(f"\nEntries with empty text after normalization: {empty_text_after_norm}"
           f" ({'kept' if args.keep_empty_text else 'not kept when filtering condition fails'})")
     print(f"Entries skipped for duration < {args.min_duration:.2f}s: {too_short_duration}")
+    print(f"Entries skipped for sampling_rate/channel mismatch: {format_mismatch}")
 
     if args.fix:
         pct = (kept / max(1, (total))) * 100.0
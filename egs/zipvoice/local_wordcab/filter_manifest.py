@@ -1,6 +1,5 @@
 #!/usr/bin/env python3
 import argparse
-import gzip
 import io
 import json
 import os
@@ -8,19 +7,20 @@ import shutil
 import sys
 import tempfile
 import time
-from typing import TextIO, Tuple
+from typing import BinaryIO, Optional, TextIO, Tuple, Union
 
-def open_maybe_gzip(path: str, mode: str) -> TextIO:
+from manifest_io import open_lines, open_text_writer, open_writer
+
+def open_maybe_gzip(path: str, mode: str) -> Union[BinaryIO, TextIO]:
     """
-    Open plain or .gz files in text mode with UTF-8 encoding.
+    Open plain or .gz files: binary for reading (iterate lines directly),
+    text mode with UTF-8 encoding for writing.
     mode should be 'r' or 'w'.
     """
     assert mode in ("r", "w")
-    text_mode = "rt" if mode == "r" else "wt"
-    if path.endswith(".gz"):
-        return gzip.open(path, text_mode, encoding="utf-8")
-    else:
-        return open(path, text_mode, encoding="utf-8", newline="\n")
+    if mode == "r":
+        return open_lines(path, gz=path.endswith(".gz"))
+    return open_text_writer(path, gz=path.endswith(".gz"))
 
 def compute_min_seconds(args) -> float:
     if args.min_seconds is not None:
@@ -54,6 +54,31 @@ def filter_line(obj: dict, min_seconds: float, check_supervisions: bool) -> bool
                 return False
     return True
 
+COPY_CHUNK_SIZE = 16 * 1024 * 1024
+
+def copy_manifest(src: str, dst: str) -> Optional[int]:
+    """
+    Copy a manifest without parsing it, (de)compressing as the .gz suffixes of
+    src/dst require. Returns the number of lines (not cuts: blank and
+    malformed lines are included) when the data had to be streamed anyway,
+    or None for a byte-identical copy, which is not read back to count them.
+    """
+    src_gz = src.endswith(".gz")
+    dst_gz = dst.endswith(".gz")
+    if src_gz == dst_gz:
+        # Byte-identical copy; shutil.copyfile() uses sendfile() on Linux.
+        shutil.copyfile(src, dst)
+        return None
+    lines = 0
+    last = b"\n"
+    with open_maybe_gzip(src, "r") as fin, open_writer(dst, gz=dst_gz) as fout:
+        for chunk in iter(lambda: fin.read(COPY_CHUNK_SIZE), b""):
+            lines += chunk.count(b"\n")
+            last = chunk[-1:]
+            fout.write(chunk)
+    # count a final line without trailing newline
+    return lines + (last != b"\n")
+
 def atomic_replace(src: str, dst: str):
     # On POSIX, os.replace is atomic within the same filesystem.
     os.replace(src, dst)
@@ -89,6 +114,12 @@ def main():
         "--check-supervisions", action="store_true",
         help="Also require every supervision.duration in each cut to be >= min-seconds."
     )
+    p.add_argument(
+        "--copy-unfiltered", action="store_true",
+        help="Only with a zero min-seconds (e.g. --pad-mode constant) and a separate --output: copy the input "
+             "through without parsing it. Unlike normal filtering, blank/malformed lines and cuts without a "
+             "numeric duration are kept."
+    )
     p.add_argument(
         "--keep-empty", action="store_true",
         help="If all cuts are filtered out, still produce an empty output file (default: exit with error)."
@@ -100,6 +131,9 @@ def main():
         sys.exit(1)
 
     min_seconds = compute_min_seconds(args)
+    if args.copy_unfiltered and (min_seconds != 0.0 or args.check_supervisions or args.output is None
+                                 or os.path.abspath(args.output) == os.path.abspath(args.input)):
+        p.error("--copy-unfiltered needs min-seconds 0, no --check-supervisions and a separate --output")
 
     # Determine output path behavior
     in_place = args.output is None or os.path.abspath(args.output) == os.path.abspath(args.input)
@@ -115,26 +149,38 @@ def main():
 
     # Write to a temp file first, then replace/move
     out_dir = os.path.dirname(os.path.abspath(output_path)) or "."
-    fd, tmp_path = tempfile.mkstemp(prefix=".filter_tmp_", dir=out_dir, text=True)
+    # Keep the .gz suffix so open_maybe_gzip() compresses the temp file too.
+    suffix = ".gz" if output_path.endswith(".gz") else ""
+    fd, tmp_path = tempfile.mkstemp(prefix=".filter_tmp_", suffix=suffix, dir=out_dir, text=True)
     os.close(fd)  # re-open with our text/gzip helper
 
     kept = 0
     total = 0
+    copied_lines = None
     try:
-        with open_maybe_gzip(args.input, "r") as fin, open_maybe_gzip(tmp_path, "w") as fout:
-            for line in fin:
-                line = line.strip()
-                if not line:
-                    continue
-                total += 1
-                try:
-                    obj = json.loads(line)
-                except json.JSONDecodeError:
-                    # Skip malformed lines
-                    continue
-                if filter_line(obj, min_seconds=min_seconds, check_supervisions=args.check_supervisions):
-                    fout.write(json.dumps(obj, ensure_ascii=False) + "\n")
-                    kept += 1
+        if args.copy_unfiltered:
+            # Opt-in: no JSON is decoded, so nothing at all is dropped.
+            copied_lines = copy_manifest(args.input, tmp_path)
+        else:
+            with open_maybe_gzip(args.input, "r") as fin, open_maybe_gzip(tmp_path, "w") as fout:
+                _loads = json.loads
+                _dumps = json.dumps
+                _filter = filter_line
+                _write = fout.write
+                check_supervisions = args.check_supervisions
+                for line in fin:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    total += 1
+                    try:
+                        obj = _loads(line)
+                    except ValueError:  # JSONDecodeError, or UnicodeDecodeError for bytes input
+                        # Skip malformed lines
+                        continue
+                    if _filter(obj, min_seconds=min_seconds, check_supervisions=check_supervisions):
+                        _write(_dumps(obj, ensure_ascii=False) + "\n")
+                        kept += 1
     except Exception as e:
         # Clean up temp file on errors
         try:
@@ -144,7 +190,7 @@ def main():
         print(f"ERROR during processing: {e}", file=sys.stderr)
         sys.exit(2)
 
-    if kept == 0 and not args.keep_empty:
+    if not args.copy_unfiltered and kept == 0 and not args.keep_empty:
         # Do not modify the original if nothing remains, unless --keep-empty
         try:
             os.remove(tmp_path)
@@ -157,7 +203,7 @@ def main():
             print("No cuts remained after filtering; not writing output.", file=sys.stderr)
         sys.exit(3)
 
-    # If output extension is .gz but tmp_path is plain, we already wrote gzip via helper.
+    # tmp_path carries the output's .gz suffix, so it is already compressed.
     # Now atomically replace/move.
     if in_place:
         atomic_replace(tmp_path, output_path)
@@ -167,6 +213,12 @@ def main():
         atomic_replace(tmp_path, output_path)
         print(f"Wrote filtered manifest to: {output_path}", file=sys.stderr)
 
+    if args.copy_unfiltered:
+        counted = "not counted" if copied_lines is None else f"{copied_lines} lines"
+        print(f"Summary: copied without parsing ({counted}; cuts not checked), "
+              f"min_seconds={min_seconds:.6f}, pad_mode={args.pad_mode}", file=sys.stderr)
+        return
+
     dropped = total - kept
     print(f"Summary: total={total}, kept={kept}, dropped={dropped}, "
           f"min_seconds={min_seconds:.6f}, pad_mode={args.pad_mode}, "
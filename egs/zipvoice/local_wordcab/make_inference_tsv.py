@@ -15,6 +15,7 @@ Usage:
 """
 
 import argparse
+import sys
 from collections import OrderedDict
 from pathlib import Path
 
@@ -158,25 +159,35 @@ PROMPTS = OrderedDict(
 
 def build_rows(voices, prompts):
     """
-    Yields rows of:
+    Returns a list of rows:
     outputfilename_without_extension, prompt_transcription, prompt_wav, text_to_synthesize
-    """
-    for v in voices:
-        vname = v["name"]
-        transcription = v["prompt_transcription"]
-        wav = v["prompt_wav"]
 
-        for pname, synth_text in prompts.items():
-            outname = f"{vname}_{pname}"  # no extension
-            yield (outname, transcription, wav, synth_text)
+    A voice/text pair is only emitted once (the first prompt name wins), so
+    duplicated prompt texts don't cost extra synthesis runs.
+    """
+    # Every voice gets the same prompts, so dropping repeated texts up front
+    # dedupes every voice/text pair. Intern the strings repeated across rows,
+    # so equal values coming from different entries share one object.
+    unique = {}
+    for pname, synth_text in prompts.items():
+        unique.setdefault(sys.intern(synth_text), pname)
+    voices = [
+        (v["name"], sys.intern(v["prompt_transcription"]), sys.intern(v["prompt_wav"]))
+        for v in voices
+    ]
+    return [
+        (f"{vname}_{pname}", transcription, wav, synth_text)  # outname has no extension
+        for vname, transcription, wav in voices
+        for synth_text, pname in unique.items()
+    ]
 
 
 def write_tsv(path: Path, rows):
     path.parent.mkdir(parents=True, exist_ok=True)
+    # Join strictly with tabs; no header row. Build the whole file and write it at once.
+    buf = "".join("\t".join(r) + "\n" for r in rows)
     with path.open("w", encoding="utf-8", newline="") as f:
-        for r in rows:
-            # Join strictly with tabs; no header row
-            f.write("\t".join(r) + "\n")
+        f.write(buf)
 
 
 def parse_args():
@@ -193,7 +204,7 @@ def parse_args():
 def main():
     args = parse_args()
     out_path = Path(args.output)
-    rows = list(build_rows(VOICES, PROMPTS))
+    rows = build_rows(VOICES, PROMPTS)
     write_tsv(out_path, rows)
     print(f"Wrote {len(rows)} rows to {out_path}")
 
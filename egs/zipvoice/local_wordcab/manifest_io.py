@@ -0,0 +1,72 @@
+"""
+Manifest reading and writing shared by check_manifest.py, check_manifest2.py
+and filter_manifest.py.
+"""
+import io
+import json
+from typing import BinaryIO, Callable, TextIO
+
+# isa-l's igzip is an API-compatible, several times faster gzip; it is optional.
+try:
+    from isal import igzip as gzip
+except ImportError:
+    import gzip
+
+# orjson parses/serializes straight from/to UTF-8 bytes and is several times
+# faster than the stdlib json module on large manifests; it is optional.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+json_loads = orjson.loads if orjson is not None else json.loads
+
+# Read buffer for manifests. Iterating a BufferedReader splits lines in C, which
+# beats any Python-level splitting; gzip streams get a large BufferedReader of
+# their own in front, so readline() doesn't go through the gzip object per line.
+READ_BUFFER_SIZE = 1 << 20
+
+# Output buffer size; coalesces the many small per-cut writes so the
+# compressor is fed large blocks.
+WRITE_BUFFER_SIZE = 8 * 1024 * 1024
+
+
+def open_lines(path: str, gz: bool) -> BinaryIO:
+    """
+    Open a manifest for binary line iteration (`for line in fh`), gzipped if
+    gz=True. Lines keep their trailing b"\\n".
+    """
+    if gz:
+        return io.BufferedReader(gzip.open(path, "rb"), buffer_size=READ_BUFFER_SIZE)
+    return open(path, "rb", buffering=READ_BUFFER_SIZE)
+
+
+def open_writer(path: str, gz: bool) -> BinaryIO:
+    """Open a buffered binary writer, gzipped if gz=True."""
+    if gz:
+        return io.BufferedWriter(gzip.open(path, "wb", compresslevel=1), buffer_size=WRITE_BUFFER_SIZE)
+    return open(path, "wb", buffering=WRITE_BUFFER_SIZE)
+
+
+def open_text_writer(path: str, gz: bool) -> TextIO:
+    """Open a UTF-8 text writer with "\\n" line endings, gzipped if gz=True."""
+    if gz:
+        return gzip.open(path, "wt", encoding="utf-8", compresslevel=1)
+    return open(path, "wt", encoding="utf-8", newline="\n")
+
+
+def json_line_dumper(ensure_ascii: bool) -> Callable[[object], bytes]:
+    """
+    Return a function serializing one object to a b"\n"-terminated UTF-8 line.
+    ensure_ascii applies to the stdlib fallback only: orjson always writes raw
+    UTF-8 with compact separators, so output bytes (not the parsed objects)
+    depend on whether orjson is installed.
+    """
+    if orjson is not None:
+        def dumps_line(obj) -> bytes:
+            # newline appended inside the serializer: no extra bytes concatenation
+            return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE)
+    else:
+        def dumps_line(obj) -> bytes:
+            return (json.dumps(obj, ensure_ascii=ensure_ascii) + "\n").encode("utf-8")
+    return dumps_line
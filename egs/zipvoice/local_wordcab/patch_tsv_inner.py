@@ -0,0 +1,89 @@
+"""
+Per-row path rewriting for patch_tsv_paths.py, kept in its own module so it
+can be compiled with mypyc (`mypyc patch_tsv_inner.py`). Without a compiled
+build this plain module is imported instead; the behaviour is the same.
+"""
+import re
+from typing import Dict, Optional
+
+_MULTI_SLASH = re.compile(r"/{2,}")
+
+def normalize_path(p: str) -> str:
+    """Collapse multiple slashes while preserving a leading '/' or '//'."""
+    if p.startswith("//"):
+        prefix, rest = "//", p[2:]
+    elif p.startswith("/"):
+        prefix, rest = "/", p[1:]
+    else:
+        prefix, rest = "", p
+    return prefix + _MULTI_SLASH.sub("/", rest).strip("/")
+
+def normalize_root(root: str) -> str:
+    """Normalize a root directory for transform_path (no trailing slash)."""
+    return normalize_path(root.rstrip("/"))
+
+def transform_path(path: str, old_root_norm: str, new_root_norm: str, force_ext: str = ".wav") -> str:
+    """
+    Replace old_root_norm prefix with new_root_norm and force extension to `force_ext`.
+    Also normalizes duplicate slashes. Both roots must already have gone
+    through normalize_root(), so callers can do that once per file.
+    """
+    original = path.strip()
+    if not original:
+        return original
+
+    # Most paths are already normalized; only run the regex when needed.
+    if "//" in original or original.endswith("/"):
+        p_norm = normalize_path(original)
+    else:
+        p_norm = original
+
+    if old_root_norm and p_norm.startswith(old_root_norm):
+        replaced = new_root_norm + p_norm[len(old_root_norm):]
+    else:
+        # Fallback: replace '/media/' component if old_root wasn't an exact prefix
+        replaced = p_norm.replace("/media/", "/media_wav_24k/")
+
+    # Force .wav extension. Same suffix rule as pathlib: a dot that starts or
+    # ends the name doesn't begin a suffix (".hidden", "name.").
+    name_start = replaced.rfind("/") + 1
+    dot = replaced.rfind(".", name_start)
+    if name_start < dot < len(replaced) - 1:
+        replaced = replaced[:dot]
+    # Every piece above is already normalized, so the result is too.
+    return replaced + force_ext
+
+def transform_line(
+    line: bytes,
+    path_col: int,
+    old_root_norm: str,
+    new_root_norm: str,
+    force_ext: str,
+    cache: Dict[bytes, bytes],
+) -> Optional[bytes]:
+    """
+    Rewrite the path field (column `path_col`) of one tab-separated row given
+    without its line terminator. Only that field is decoded; the bytes around
+    it are kept as-is. Returns None if the row has too few columns.
+    `cache` maps original path fields to rewritten ones across calls.
+    """
+    start = 0
+    col = 0
+    while col < path_col:
+        tab = line.find(b"\t", start)
+        if tab == -1:
+            return None
+        start = tab + 1
+        col += 1
+    stop = line.find(b"\t", start)
+    if stop == -1:
+        stop = len(line)
+
+    old_path = line[start:stop]
+    new_path = cache.get(old_path)
+    if new_path is None:
+        new_path = transform_path(
+            old_path.decode("utf-8"), old_root_norm, new_root_norm, force_ext
+        ).encode("utf-8")
+        cache[old_path] = new_path
+    return line[:start] + new_path + line[stop:]
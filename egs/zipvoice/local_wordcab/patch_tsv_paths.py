@@ -1,53 +1,20 @@
 #!/usr/bin/env python3
 import argparse
-import csv
-csv.field_size_limit(2_147_483_647)
 import os
 import sys
 import signal
-from pathlib import PurePosixPath
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from tempfile import NamedTemporaryFile
 from shutil import move
 
+from patch_tsv_inner import normalize_root, transform_line
+
 # Exit quietly when the downstream pipe (e.g., `head`) closes
 signal.signal(signal.SIGPIPE, signal.SIG_DFL)
 
-def normalize_path(p: str) -> str:
-    """Collapse multiple slashes while preserving a leading '/' or '//'."""
-    if p.startswith("//"):
-        prefix, rest = "//", p[2:]
-    elif p.startswith("/"):
-        prefix, rest = "/", p[1:]
-    else:
-        prefix, rest = "", p
-    rest = "/".join(seg for seg in rest.split("/") if seg != "")
-    return prefix + rest
-
-def transform_path(path: str, old_root: str, new_root: str, force_ext: str = ".wav") -> str:
-    """
-    Replace old_root prefix with new_root and force extension to `force_ext`.
-    Also normalizes duplicate slashes.
-    """
-    original = path.strip()
-    if not original:
-        return original
-
-    old_root_norm = normalize_path(old_root.rstrip("/"))
-    new_root_norm = normalize_path(new_root.rstrip("/"))
-    p_norm = normalize_path(original)
-
-    if old_root_norm and p_norm.startswith(old_root_norm):
-        replaced = new_root_norm + p_norm[len(old_root_norm):]
-    else:
-        # Fallback: replace '/media/' component if old_root wasn't an exact prefix
-        replaced = p_norm.replace("/media/", "/media_wav_24k/")
-
-    # Force .wav extension
-    posix = PurePosixPath(replaced)
-    new_name = posix.stem + force_ext
-    replaced = str(posix.with_name(new_name))
-
-    return normalize_path(replaced)
+# Buffer size for reading/writing the TSVs.
+IO_BUFFER_SIZE = 1 << 20
 
 def patch_tsv(
     infile: str,
@@ -66,41 +33,58 @@ def patch_tsv(
     outfh = None
     tmpfile = None
     if inplace and not dry_run:
-        tmp = NamedTemporaryFile("w", delete=False, newline="", encoding="utf-8")
+        # Create the temp file next to the target so the final move is a rename.
+        tmp = NamedTemporaryFile("wb", delete=False, buffering=IO_BUFFER_SIZE,
+                                 dir=os.path.dirname(os.path.abspath(infile)),
+                                 prefix=os.path.basename(infile) + ".", suffix=".tmp")
         outfh = tmp
         tmpfile = tmp.name
     else:
-        outfh = sys.stdout
+        outfh = sys.stdout.buffer
 
-    exit_code = 0
-    with open(infile, "r", newline="", encoding="utf-8") as infh:
-        reader = csv.reader(infh, delimiter="\t")
-        writer = csv.writer(outfh, delimiter="\t", lineterminator="\n")
+    old_root_norm = normalize_root(old_root)
+    new_root_norm = normalize_root(new_root)
+    force_ext = ".wav"
+    # Prompt paths repeat across many rows; transform each distinct path once.
+    cache = {}
 
-        for lineno, row in enumerate(reader, start=1):
-            if not row:
-                writer.writerow(row)
+    exit_code = 0
+    with open(infile, "rb", buffering=IO_BUFFER_SIZE) as infh:
+        write = outfh.write
+        # Plain tab-separated rows (no quoting); transform_line() rewrites
+        # only the path field and copies the bytes around it unchanged.
+        for lineno, raw in enumerate(infh, start=1):
+            line = raw.rstrip(b"\r\n")
+            if not line:
+                write(b"\n")
                 continue
 
-            if len(row) <= path_col:
+            new_line = transform_line(line, path_col, old_root_norm, new_root_norm, force_ext, cache)
+            if new_line is None:
                 if verbose:
-                    print(f"WARNING: {infile}:{lineno}: expected ≥ {path_col+1} columns, got {len(row)}; unchanged.", file=sys.stderr)
-                writer.writerow(row)
+                    ncols = line.count(b"\t") + 1
+                    print(f"WARNING: {infile}:{lineno}: expected ≥ {path_col+1} columns, got {ncols}; unchanged.", file=sys.stderr)
+                write(line + b"\n")
                 continue
 
-            old_path = row[path_col]
-            new_path = transform_path(old_path, old_root=old_root, new_root=new_root, force_ext=".wav")
-
-            if verbose and new_path != old_path:
+            if verbose and new_line != line:
+                old_path = line.split(b"\t")[path_col].decode("utf-8")
+                new_path = new_line.split(b"\t")[path_col].decode("utf-8")
                 print(f"{infile}:{lineno}: {old_path} -> {new_path}", file=sys.stderr)
 
-            row[path_col] = new_path
             try:
-                writer.writerow(row)
+                write(new_line + b"\n")
             except BrokenPipeError:
                 # In case SIGPIPE handling didn’t kick in on some platforms
                 return exit_code
 
+    # flush, fsync and close the temp file before it is moved, so neither
+    # buffered rows nor a crash right after the rename can lose data
+    if tmpfile is not None:
+        outfh.flush()
+        os.fsync(outfh.fileno())
+        outfh.close()
+
     if inplace and not dry_run:
         if backup_suffix:
             backup_path = infile + backup_suffix
@@ -137,19 +121,28 @@ def main():
     parser.add_argument("-v", "--verbose", action="store_true", help="Print per-line changes to stderr.")
     args = parser.parse_args()
 
+    patch = partial(
+        patch_tsv,
+        path_col=args.path_col,
+        old_root=args.old_root,
+        new_root=args.new_root,
+        inplace=args.inplace,
+        backup_suffix=args.backup_suffix,
+        dry_run=args.dry_run,
+        verbose=args.verbose,
+    )
+
     overall = 0
-    for tsv in args.tsv:
-        rc = patch_tsv(
-            infile=tsv,
-            path_col=args.path_col,
-            old_root=args.old_root,
-            new_root=args.new_root,
-            inplace=args.inplace,
-            backup_suffix=args.backup_suffix,
-            dry_run=args.dry_run,
-            verbose=args.verbose,
-        )
-        overall |= rc
+    if args.inplace and not args.dry_run and len(args.tsv) > 1:
+        # Each file goes to its own temp file, so they can be patched in
+        # parallel; stdout output would interleave, so that stays serial.
+        workers = min(len(args.tsv), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            for rc in ex.map(patch, args.tsv):
+                overall |= rc
+    else:
+        for tsv in args.tsv:
+            overall |= patch(tsv)
     sys.exit(overall)
 
 if __name__ == "__main__":
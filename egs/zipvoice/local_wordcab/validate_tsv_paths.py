@@ -2,11 +2,91 @@
 import argparse
 import csv
 csv.field_size_limit(2_147_483_647)
+import io
 import os
 import re
 import shutil
+import struct
 import subprocess
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+# PyAV reads the stream parameters through libavformat in-process, without a
+# fork/exec of ffprobe per file; it is optional.
+try:
+    import av
+except ImportError:
+    av = None
+
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+# (format_tag, bits_per_sample) -> ffmpeg codec name, for the common PCM cases
+WAV_CODEC_NAMES = {
+    (0x0001, 8): "pcm_u8",
+    (0x0001, 16): "pcm_s16le",
+    (0x0001, 24): "pcm_s24le",
+    (0x0001, 32): "pcm_s32le",
+    (0x0003, 32): "pcm_f32le",
+    (0x0003, 64): "pcm_f64le",
+}
+
+def read_wav_format(path):
+    """Return (format_tag, channels, sample_rate, bits_per_sample) from the
+    RIFF/WAVE fmt chunk, or None if the file is not a plain RIFF/WAVE file."""
+    with open(path, "rb") as f:
+        hdr = f.read(12)
+        if len(hdr) < 12 or hdr[:4] != b"RIFF" or hdr[8:12] != b"WAVE":
+            return None
+        # fmt is usually the first chunk, but LIST/JUNK/etc. may precede it.
+        while True:
+            chunk = f.read(8)
+            if len(chunk) < 8:
+                return None
+            chunk_id, size = struct.unpack("<4sI", chunk)
+            if chunk_id == b"fmt ":
+                body = f.read(size)
+                if len(body) < 16:
+                    return None
+                format_tag, channels, sample_rate, _, _, bits = struct.unpack_from("<HHIIHH", body)
+                if format_tag == WAVE_FORMAT_EXTENSIBLE and len(body) >= 26:
+                    # The real format code is the first two bytes of SubFormat.
+                    (format_tag,) = struct.unpack_from("<H", body, 24)
+                return format_tag, channels, sample_rate, bits
+            f.seek(size + (size & 1), os.SEEK_CUR)  # chunks are word-aligned
+
+def check_with_wav_header(path, fallback=None):
+    """Return (ok, details) where ok=True if mono/24k/pcm_s16le.
+
+    Reads only the RIFF header; anything that isn't a plain RIFF/WAVE file is
+    handed to `fallback` (PyAV or ffprobe) when one is available.
+    """
+    try:
+        fmt = read_wav_format(path)
+    except OSError as e:
+        return (False, f"wav header error: {e}")
+    if fmt is None:
+        if fallback is not None:
+            return fallback(path)
+        return (False, "not a RIFF/WAVE file")
+    format_tag, channels, sample_rate, bits = fmt
+    codec_name = WAV_CODEC_NAMES.get((format_tag, bits), f"wav_format_0x{format_tag:04x}")
+    ok = (channels == 1 and sample_rate == 24000 and codec_name == "pcm_s16le")
+    return (ok, f"channels={channels}, rate={sample_rate}, codec={codec_name}")
+
+def check_with_pyav(path):
+    """Return (ok, details) where ok=True if mono/24k/pcm_s16le."""
+    try:
+        with av.open(path) as container:
+            if not container.streams.audio:
+                return (False, "pyav: no audio stream")
+            ctx = container.streams.audio[0].codec_context
+            channels = ctx.channels
+            sample_rate = ctx.sample_rate
+            codec_name = ctx.name.lower()
+        ok = (channels == 1 and sample_rate == 24000 and codec_name == "pcm_s16le")
+        return (ok, f"channels={channels}, rate={sample_rate}, codec={codec_name}")
+    except Exception as e:
+        return (False, f"pyav error: {e}")
 
 def check_with_ffprobe(path):
     """Return (ok, details) where ok=True if mono/24k/pcm_s16le."""
@@ -36,54 +116,92 @@ def check_with_ffprobe(path):
     except Exception as e:
         return (False, f"ffprobe parse error: {e}")
 
-def validate_file(tsv, path_col, new_root, use_ffprobe, quiet):
+def list_files(d):
+    """Return the names of regular files (following symlinks) in directory d,
+    or None if it can't be listed."""
+    try:
+        with os.scandir(d or ".") as it:
+            return {e.name for e in it if e.is_file()}
+    except FileNotFoundError:
+        return set()
+    except OSError:
+        return None  # e.g. not listable; fall back to a per-path stat
+
+def validate_file(tsv, path_col, new_root, use_ffprobe, quiet, executor):
     errors = 0
     warnings = 0
     checked = 0
     new_root = new_root.rstrip("/")
 
+    # The RIFF header answers the question for plain WAVs; PyAV (or ffprobe)
+    # is only needed for files the header parser doesn't recognise.
+    if av is not None:
+        fallback = check_with_pyav
+    elif shutil.which("ffprobe") is not None:
+        fallback = check_with_ffprobe
+    else:
+        fallback = None
+        if use_ffprobe:
+            print("WARN: neither PyAV nor ffprobe found; only RIFF/WAVE headers will be checked.",
+                  file=sys.stderr)
+    check_format = partial(check_with_wav_header, fallback=fallback)
+    to_probe = []  # (lineno, path) of existing files for the ffprobe check
+
+    rows = []  # (lineno, path)
     with open(tsv, "r", encoding="utf-8", newline="") as fh:
         reader = csv.reader(fh, delimiter="\t")
         for lineno, row in enumerate(reader, start=1):
             if not row or len(row) <= path_col:
                 continue
-            p = row[path_col].strip()
-            checked += 1
-
-            # Basic checks
-            if not p.startswith("/"):
-                print(f"{tsv}:{lineno}: ERROR: path not absolute: {p}", file=sys.stderr)
-                errors += 1
-
-            if "//" in p:
-                print(f"{tsv}:{lineno}: WARN: path contains double slashes: {p}", file=sys.stderr)
-                warnings += 1
-
-            if not p.lower().endswith(".wav"):
-                print(f"{tsv}:{lineno}: ERROR: not a .wav path: {p}", file=sys.stderr)
-                errors += 1
-
-            if not p.startswith(new_root + "/"):
-                print(f"{tsv}:{lineno}: ERROR: not under new root '{new_root}': {p}", file=sys.stderr)
-                errors += 1
-
-            if not os.path.isfile(p):
-                print(f"{tsv}:{lineno}: ERROR: file does not exist: {p}", file=sys.stderr)
-                errors += 1
-                continue  # ffprobe would fail anyway
-
-            # Optional ffprobe verification
-            if use_ffprobe:
-                if shutil.which("ffprobe") is None:
-                    print("ERROR: ffprobe not found in PATH (skip codec check).", file=sys.stderr)
-                    use_ffprobe = False
-                else:
-                    ok, details = check_with_ffprobe(p)
-                    if not ok:
-                        print(f"{tsv}:{lineno}: ERROR: ffprobe check failed ({details}): {p}", file=sys.stderr)
-                        errors += 1
-                    elif not quiet:
-                        print(f"{tsv}:{lineno}: OK: {details}: {p}", file=sys.stderr)
+            rows.append((lineno, row[path_col].strip()))
+
+    # Rows tend to share directories (voice/prompt grids), so list each
+    # directory once instead of stat'ing every path. On a cold cache every
+    # listing waits on the disk, so keep many of them in flight at once.
+    dirs = list(dict.fromkeys(os.path.dirname(p) for _, p in rows))
+    dir_files = dict(zip(dirs, executor.map(list_files, dirs)))
+
+    for lineno, p in rows:
+        checked += 1
+
+        # Basic checks
+        if not p.startswith("/"):
+            print(f"{tsv}:{lineno}: ERROR: path not absolute: {p}", file=sys.stderr)
+            errors += 1
+
+        if "//" in p:
+            print(f"{tsv}:{lineno}: WARN: path contains double slashes: {p}", file=sys.stderr)
+            warnings += 1
+
+        if p[-4:].lower() != ".wav":  # lowercase only the suffix, not the whole path
+            print(f"{tsv}:{lineno}: ERROR: not a .wav path: {p}", file=sys.stderr)
+            errors += 1
+
+        if not p.startswith(new_root + "/"):
+            print(f"{tsv}:{lineno}: ERROR: not under new root '{new_root}': {p}", file=sys.stderr)
+            errors += 1
+
+        d, name = os.path.split(p)
+        files = dir_files[d]
+        exists = name in files if files is not None else os.path.isfile(p)
+        if not exists:
+            print(f"{tsv}:{lineno}: ERROR: file does not exist: {p}", file=sys.stderr)
+            errors += 1
+            continue  # format check would fail anyway
+
+        if use_ffprobe:
+            to_probe.append((lineno, p))
+
+    # Optional format verification (RIFF header, then PyAV/ffprobe fallback).
+    # Each check mostly waits on disk (and, for ffprobe, process startup), so
+    # run them concurrently; map() returns the results in row order.
+    results = executor.map(check_format, [p for _, p in to_probe])
+    for (lineno, p), (ok, details) in zip(to_probe, results):
+        if not ok:
+            print(f"{tsv}:{lineno}: ERROR: format check failed ({details}): {p}", file=sys.stderr)
+            errors += 1
+        elif not quiet:
+            print(f"{tsv}:{lineno}: OK: {details}: {p}", file=sys.stderr)
 
     return checked, warnings, errors
 
@@ -96,19 +214,30 @@ def main():
     ap.add_argument("--new-root", default="/srv/speechcatcher/en_au/media_wav_24k",
                     help="Expected new root for audio files (default: %(default)s).")
     ap.add_argument("--ffprobe", action="store_true",
-                    help="Use ffprobe to verify mono/24kHz/pcm_s16le.")
+                    help="Verify mono/24kHz/pcm_s16le (from the WAV header; PyAV or ffprobe for other files).")
     ap.add_argument("-q", "--quiet", action="store_true", help="Less verbose when ffprobe is used.")
+    ap.add_argument("-j", "--jobs", type=int, default=2 * (os.cpu_count() or 1),
+                    help="Number of concurrent directory listings / format checks (default: 2 x number of CPUs).")
     args = ap.parse_args()
 
+    # Per-row messages go to stderr, which writes every line straight away;
+    # buffer them instead (flushed before the summary and at exit).
+    sys.stderr = io.TextIOWrapper(
+        io.BufferedWriter(io.FileIO(sys.stderr.fileno(), "w", closefd=False), buffer_size=1 << 16),
+        encoding=sys.stderr.encoding, errors=sys.stderr.errors,
+    )
+
     total_checked = total_warn = total_err = 0
-    for tsv in args.tsv:
-        checked, warns, errs = validate_file(
-            tsv, args.path_col, args.new_root, args.ffprobe, args.quiet
-        )
-        total_checked += checked
-        total_warn += warns
-        total_err += errs
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as executor:
+        for tsv in args.tsv:
+            checked, warns, errs = validate_file(
+                tsv, args.path_col, args.new_root, args.ffprobe, args.quiet, executor
+            )
+            total_checked += checked
+            total_warn += warns
+            total_err += errs
 
+    sys.stderr.flush()
     print(f"\nChecked rows: {total_checked} | Warnings: {total_warn} | Errors: {total_err}")
     sys.exit(1 if total_err else 0)
 